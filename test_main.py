@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import main
+
+
+class SortFilesByExtensionsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+
+    def touch(self, *parts: str) -> None:
+        path = os.path.join(self.root, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "w").close()
+
+    def exists(self, *parts: str) -> bool:
+        return os.path.exists(os.path.join(self.root, *parts))
+
+    def test_moves_files_into_subfolders(self) -> None:
+        self.touch("a.jpg")
+        self.touch("b.mp3")
+        self.touch("notes.txt")
+        self.touch("nested", "c.mp4")
+
+        main.Folder(self.root).sort_files_by_extensions()
+
+        self.assertTrue(self.exists("image", "a.jpg"))
+        self.assertTrue(self.exists("audio", "b.mp3"))
+        self.assertTrue(self.exists("notes.txt"))
+        self.assertTrue(self.exists("nested", "video", "c.mp4"))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "renameat is Linux only")
+    def test_uses_directory_fds_on_linux(self) -> None:
+        self.assertTrue(main._HAS_DIR_FD)
+        self.touch("a.jpg")
+
+        with mock.patch("os.rename", wraps=os.rename) as rename:
+            main.Folder(self.root).sort_files_by_extensions()
+
+        rename.assert_called_once()
+        self.assertEqual(rename.call_args.args, ("a.jpg", "a.jpg"))
+        self.assertIn("src_dir_fd", rename.call_args.kwargs)
+        self.assertIn("dst_dir_fd", rename.call_args.kwargs)
+        self.assertTrue(self.exists("image", "a.jpg"))
+
+    def test_threaded_failure_waits_for_all_moves(self) -> None:
+        for i in range(main._PARALLEL_MIN_FILES * 2):
+            self.touch(f"{i}.jpg")
+        real_rename = os.rename
+
+        def rename(src, dst, **kwargs):
+            if os.path.basename(src) == "0.jpg":
+                raise OSError("boom")
+            real_rename(src, dst, **kwargs)
+
+        with mock.patch("os.rename", side_effect=rename):
+            with self.assertRaises(OSError):
+                main.Folder(self.root).sort_files_by_extensions()
+
+        # Every other file was moved before the fds were closed.
+        moved = os.listdir(os.path.join(self.root, "image"))
+        self.assertEqual(len(moved), main._PARALLEL_MIN_FILES * 2 - 1)
+
+    def test_logs_moved_files_when_a_move_fails(self) -> None:
+        count = main._PARALLEL_MIN_FILES * 2
+        for i in range(count):
+            self.touch(f"{i}.jpg")
+        real_rename = os.rename
+
+        def rename(src, dst, **kwargs):
+            if os.path.basename(src) == "0.jpg":
+                raise OSError("boom")
+            real_rename(src, dst, **kwargs)
+
+        with mock.patch("os.rename", side_effect=rename):
+            with self.assertLogs(main.logger, "INFO") as logs:
+                with self.assertRaises(OSError):
+                    main.Folder(self.root).sort_files_by_extensions()
+
+        # One line per moved file; the failed one is not logged.
+        messages = [record.getMessage() for record in logs.records]
+        self.assertEqual(len(messages), count - 1)
+        self.assertIn("1.jpg ---> image/1.jpg", messages)
+        self.assertNotIn("0.jpg ---> image/0.jpg", messages)
+
+
+if __name__ == "__main__":
+    unittest.main()